@@ -1,5 +1,11 @@
 # app.py (cleaned & corrected)
 import os
+import csv
+import io
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
 from dotenv import load_dotenv
 import streamlit as st
 
@@ -35,6 +41,72 @@ import utils
 # Configure genai in llm module
 llm.configure_genai(API_KEY)
 
+
+def _prepare_render(parsed, ui_lang):
+    """
+    Extract the user-facing fields from a parsed analysis and translate
+    them (one batched call) for ui_lang. Returns a dict of ready-to-render
+    values so the result can be cached per language in session_state.
+    """
+    pres_md = parsed.get("presentation_markdown")
+    short_sum = parsed.get("short_summary", "")
+    laws = parsed.get("relevant_laws", []) or []
+    briefs = [law.get("brief") or "" for law in laws]
+    action_plan = [str(s) for s in (parsed.get("action_plan", []) or [])]
+    drafts = parsed.get("drafts") or {}
+    draft_names = list(drafts.keys())
+    draft_vals = [drafts[n] or "" for n in draft_names]
+    evidence = [str(e) for e in (parsed.get("evidence_checklist", []) or [])]
+
+    # Prefer the model-supplied i18n translations: one Gemini call covers
+    # the whole page with zero Google Translate round trips.
+    if ui_lang != "English":
+        i18n = parsed.get("i18n") or {}
+        if i18n:
+            if pres_md and i18n.get("presentation_markdown"):
+                pres_md = i18n["presentation_markdown"]
+            short_sum = i18n.get("short_summary") or short_sum
+            tr_briefs = i18n.get("laws_brief") or []
+            if len(tr_briefs) == len(briefs):
+                briefs = [str(b) for b in tr_briefs]
+            tr_plan = i18n.get("action_plan") or []
+            if len(tr_plan) == len(action_plan):
+                action_plan = [str(s) for s in tr_plan]
+            tr_evidence = i18n.get("evidence_checklist") or []
+            if len(tr_evidence) == len(evidence):
+                evidence = [str(e) for e in tr_evidence]
+            tr_drafts = i18n.get("drafts") or {}
+            draft_vals = [tr_drafts.get(n) or v for n, v in zip(draft_names, draft_vals)]
+
+    # Fallback for responses without usable i18n (older cached output,
+    # partial compliance): when the summary isn't already in a native
+    # script, batch-translate every string in ONE round trip instead of
+    # one HTTPS call per field.
+    if ui_lang != "English" and not utils.looks_non_english(short_sum):
+        batch = [pres_md or "", short_sum] + briefs + action_plan + draft_vals + evidence
+        with utils.timed("translate_render"):
+            out = utils.translate_many(batch, ui_lang)
+        it = iter(out)
+        tr_pres = next(it)
+        if pres_md:
+            pres_md = tr_pres
+        short_sum = next(it)
+        briefs = [next(it) for _ in briefs]
+        action_plan = [next(it) for _ in action_plan]
+        draft_vals = [next(it) for _ in draft_vals]
+        evidence = [next(it) for _ in evidence]
+
+    return {
+        "pres_md": pres_md,
+        "short_sum": short_sum,
+        "laws": laws,
+        "briefs": briefs,
+        "action_plan": action_plan,
+        "draft_names": draft_names,
+        "draft_vals": draft_vals,
+        "evidence": evidence,
+    }
+
 # -------------------------
 # App UI
 # -------------------------
@@ -86,81 +158,105 @@ if page == "Analyze":
         # Translate input to English for the LLM if UI language isn't English
         input_for_model = user_text
         if ui_lang != "English":
-            input_for_model = utils.translate_text(user_text, "English")
+            with utils.timed("translate_input"):
+                input_for_model = utils.translate_text(user_text, "English")
 
         # Build prompt and call LLM
         prompt = llm.build_prompt(input_for_model, ui_lang, anonymous_mode, location_hint)
-        with st.spinner("Contacting model and generating outputs..."):
-            raw = llm.call_gemini(prompt)
-            parsed = llm.extract_json_from_text(raw)
 
-            # Save to session_state so we can render after reruns
-            st.session_state.analysis_raw = raw
-            st.session_state.analysis_parsed = parsed
+        # Stream tokens live into a placeholder (time-to-first-token instead of
+        # full-response latency), then clear it — the parsed JSON is rendered
+        # properly below.
+        stream_placeholder = st.empty()
+        with utils.timed("gemini"):
+            try:
+                with stream_placeholder.container():
+                    st.caption("Generating (live output)...")
+                    raw = st.write_stream(llm.stream_gemini(prompt))
+            except Exception:
+                # Non-stream fallback if streaming is unavailable
+                with st.spinner("Contacting model and generating outputs..."):
+                    raw = llm.call_gemini(prompt)
+        stream_placeholder.empty()
 
-            # handle error-in-JSON case immediately so user sees message
-            if parsed and isinstance(parsed, dict) and "error" in parsed:
-                st.error(f"Gemini API error: {parsed['error']}")
-                st.code(raw)
-                st.stop()
+        parsed = llm.extract_json_from_text(raw)
 
-            if not parsed:
-                st.error("Model did not return valid JSON. See raw output below.")
-                st.code(raw)
-                st.stop()
+        # Save to session_state so we can render after reruns
+        st.session_state.analysis_raw = raw
+        st.session_state.analysis_parsed = parsed
+
+        # handle error-in-JSON case immediately so user sees message
+        if parsed and isinstance(parsed, dict) and "error" in parsed:
+            st.error(f"Gemini API error: {parsed['error']}")
+            st.code(raw)
+            st.stop()
+
+        if not parsed:
+            st.error("Model did not return valid JSON. See raw output below.")
+            st.code(raw)
+            st.stop()
 
     # ---- render last successful analysis, if any ----
     parsed = st.session_state.analysis_parsed
     raw = st.session_state.analysis_raw
 
     if parsed:
+        # Widget clicks rerun the whole script; reuse the translated fields
+        # from session_state instead of re-translating on every rerun.
+        # Entries invalidate when a new analysis arrives (raw changes) and
+        # are built lazily per language.
+        render_cache = st.session_state.setdefault("_render_cache", {})
+        entry = render_cache.get(ui_lang)
+        if entry is None or entry[0] != raw:
+            fields = _prepare_render(parsed, ui_lang)
+            # Never pin a failed pass: if a non-English render still came
+            # back in English (no usable i18n and the batch translation
+            # fell back to the originals), skip the cache write so the
+            # next rerun retries translation.
+            if ui_lang == "English" or utils.looks_non_english(fields["short_sum"]):
+                render_cache[ui_lang] = (raw, fields)
+        else:
+            fields = entry[1]
+
+        pres_md = fields["pres_md"]
+        short_sum = fields["short_sum"]
+        laws = fields["laws"]
+        briefs = fields["briefs"]
+        action_plan = fields["action_plan"]
+        drafts = parsed.get("drafts") or {}
+        draft_names = fields["draft_names"]
+        draft_vals = fields["draft_vals"]
+        evidence = fields["evidence"]
+
         # Render presentation_markdown if provided by model
-        pres_md = parsed.get("presentation_markdown")
         if pres_md:
-            if ui_lang != "English":
-                pres_md = utils.translate_text(pres_md, ui_lang)
             st.markdown(pres_md, unsafe_allow_html=True)
         else:
             # Fallback summary
             st.header("Legal Advice (summary)")
-            short_sum = parsed.get("short_summary", "")
-            if ui_lang != "English":
-                short_sum = utils.translate_text(short_sum, ui_lang)
             st.write(short_sum)
 
         # Relevant laws
         st.markdown("### Relevant Laws")
-        laws = parsed.get("relevant_laws", []) or []
         if laws:
-            for law in laws:
+            for law, brief in zip(laws, briefs):
                 sec = law.get("section") or law.get("name") or ""
-                brief = law.get("brief") or ""
-                if ui_lang != "English":
-                    brief = utils.translate_text(brief, ui_lang)
                 st.markdown(f"- **{sec}** — {brief}")
         else:
             st.write("No relevant laws returned.")
 
         # Action plan
         st.markdown("### Step-by-step Action Plan")
-        action_plan = parsed.get("action_plan", []) or []
         if action_plan:
-            for i, step in enumerate(action_plan, start=1):
-                step_text = step
-                if ui_lang != "English":
-                    step_text = utils.translate_text(step_text, ui_lang)
+            for i, step_text in enumerate(action_plan, start=1):
                 st.markdown(f"{i}. {step_text}")
         else:
             st.write("No action plan returned.")
 
         # Drafts
-        drafts = parsed.get("drafts") or {}
         if drafts:
             st.markdown("### Drafts")
-            for name, content in drafts.items():
-                val = content or ""
-                if ui_lang != "English":
-                    val = utils.translate_text(val, ui_lang)
+            for name, val in zip(draft_names, draft_vals):
                 with st.expander(name):
                     edited = st.text_area(
                         f"Edit {name}", value=val, height=220, key=f"draft_{name}"
@@ -171,14 +267,13 @@ if page == "Analyze":
 
         # Evidence checklist
         st.markdown("### Evidence Checklist")
-        evidence = parsed.get("evidence_checklist", []) or []
         if evidence:
-            for ev in evidence:
-                ev_text = ev
-                if ui_lang != "English":
-                    ev_text = utils.translate_text(ev_text, ui_lang)
-                # different keys so each checkbox is independent & sticky
-                st.checkbox(ev_text, key=f"ev_{hash(ev_text)}")
+            for i, ev_text in enumerate(evidence):
+                # Stable, collision-safe key: built-in hash() changes across
+                # processes (PYTHONHASHSEED), which would drop checkbox state
+                # on every server restart.
+                digest = hashlib.blake2b(ev_text.encode(), digest_size=6).hexdigest()
+                st.checkbox(ev_text, key=f"ev_{i}_{digest}")
         else:
             st.write("No evidence suggestions.")
 
@@ -196,7 +291,8 @@ elif page == "Nearby Services":
     if not location_hint.strip():
         st.info("Enter a pincode or city in the sidebar to search nearby services.")
     else:
-        geo = nearby.geocode_location(location_hint)
+        with utils.timed("geocode"):
+            geo = nearby.geocode_location(location_hint)
         if not geo:
             st.error("Could not geocode that location. Try '560001 Bengaluru' or a city name.")
         else:
@@ -210,19 +306,35 @@ elif page == "Nearby Services":
                 "Hospitals": "hospital",
             }
 
-            import pandas as pd
-            for title, q in categories.items():
+            # The four category searches are independent, network-bound calls;
+            # fire them concurrently and render once all futures resolve.
+            # (Executor shutdown waits, so the timing covers all four.)
+            with utils.timed("nearby_search"):
+                with ThreadPoolExecutor(max_workers=len(categories)) as ex:
+                    futures = {
+                        title: ex.submit(nearby.nearby_search, q, lat, lon, max_results)
+                        for title, q in categories.items()
+                    }
+
+            for title, fut in futures.items():
                 st.markdown(f"### {title}")
-                hits = nearby.nearby_search(q, lat, lon, limit=max_results)
+                try:
+                    hits = fut.result()
+                except Exception:
+                    hits = []
                 if not hits:
                     st.write("No results found (try a nearby city or use Google Places API).")
                     continue
-                df = pd.DataFrame(hits)
-                for idx, row in df.iterrows():
-                    st.markdown(f"**{idx+1}.** {row['name']}  \n{row['address']}  \nDistance: {row['distance_km']} km")
-                if not df.empty:
-                    st.map(df.rename(columns={"lat": "lat", "lon": "lon"})[["lat", "lon"]])
-                    st.download_button(f"Download {title} (CSV)", df.to_csv(index=False), file_name=f"{title.replace(' ', '_')}.csv")
+                # hits is <=10 dicts; render directly rather than paying
+                # DataFrame construction + Arrow serialization
+                for idx, row in enumerate(hits, start=1):
+                    st.markdown(f"**{idx}.** {row['name']}  \n{row['address']}  \nDistance: {row['distance_km']} km")
+                st.map({"lat": [h["lat"] for h in hits], "lon": [h["lon"] for h in hits]})
+                buf = io.StringIO()
+                writer = csv.DictWriter(buf, fieldnames=["name", "address", "lat", "lon", "distance_km"])
+                writer.writeheader()
+                writer.writerows(hits)
+                st.download_button(f"Download {title} (CSV)", buf.getvalue(), file_name=f"{title.replace(' ', '_')}.csv")
 
 # -------------------------
 # Settings / Debug page
@@ -233,3 +345,14 @@ else:
     st.write(".env present:", os.path.exists(os.path.join(os.path.dirname(__file__), ".env")))
     st.write("GEMINI_API_KEY loaded length:", len(os.getenv("GEMINI_API_KEY") or ""))
     st.write("Modules loaded: llm, nearby, utils")
+
+    st.markdown("### Per-stage latency (this session)")
+    timings = st.session_state.get("_timings") or []
+    if timings:
+        df = pd.DataFrame(timings)
+        stats = df.groupby("name")["elapsed_s"].agg(
+            count="count", mean="mean", p95=lambda s: s.quantile(0.95)
+        )
+        st.dataframe(stats.style.format("{:.3f}", subset=["mean", "p95"]))
+    else:
+        st.write("No timings recorded yet — run an Analyze or Nearby query first.")
@@ -1,10 +1,60 @@
 # llm.py
 import os
 import json
+import hashlib
 from typing import Optional, Dict, Any
 
-# Note: google.generativeai is configured from app.py via configure_genai()
-import google.generativeai as genai
+# Note: google.generativeai is imported AND configured lazily (cold import
+# is slow). configure_genai only records the key; the SDK loads on the first
+# model call, so pages that never call the LLM (Nearby, Settings) don't pay
+# for the import even though app.py calls configure_genai on every rerun.
+genai = None
+_configured = False
+
+
+def _genai():
+    """Import and configure google.generativeai on first use."""
+    global genai, _configured
+    if genai is None:
+        import google.generativeai as _g
+        genai = _g
+    if not _configured:
+        api_key = os.getenv("GEMINI_API_KEY") or os.getenv("GOOGLE_API_KEY")
+        if api_key:
+            genai.configure(api_key=api_key)
+            _configured = True
+    return genai
+
+try:
+    import diskcache
+    _LLM_CACHE = diskcache.Cache(".llm_cache")
+except Exception:
+    _LLM_CACHE = None
+
+# Identical prompts return identical JSON for a week without a model call.
+_LLM_TTL = 7 * 86400
+
+
+def _llm_cache_key(model_name: str, prompt: str) -> str:
+    return hashlib.sha256((model_name + "|" + prompt).encode()).hexdigest()
+
+
+def _llm_cache_get(model_name: str, prompt: str) -> Optional[str]:
+    if _LLM_CACHE is None:
+        return None
+    try:
+        return _LLM_CACHE.get(_llm_cache_key(model_name, prompt))
+    except Exception:
+        return None
+
+
+def _llm_cache_set(model_name: str, prompt: str, text: str) -> None:
+    if _LLM_CACHE is None or not text:
+        return
+    try:
+        _LLM_CACHE.set(_llm_cache_key(model_name, prompt), text, expire=_LLM_TTL)
+    except Exception:
+        pass
 
 
 # ---------------------------
@@ -12,14 +62,17 @@ import google.generativeai as genai
 # ---------------------------
 def configure_genai(api_key: str) -> None:
     """
-    Configure the google-generativeai SDK with the provided API key.
-    Call this once from app.py AFTER loading .env.
+    Record the API key for the google-generativeai SDK.
+    Call this once from app.py AFTER loading .env. The SDK itself is
+    imported and configured on the first model call.
     """
+    global _configured
     if not api_key:
         raise ValueError("API key required for configure_genai()")
     os.environ["GOOGLE_API_KEY"] = api_key
     os.environ["GEMINI_API_KEY"] = api_key
-    genai.configure(api_key=api_key)
+    # Force a re-configure on next use in case the key changed
+    _configured = False
 
 
 # ---------------------------
@@ -61,6 +114,10 @@ Return a single JSON object ONLY with fields:
 - action_plan: ordered list of steps (strings)
 - evidence_checklist: list of strings
 - presentation_markdown: a concise human-friendly markdown (max ~300 words) summarizing advice
+- i18n: ONLY when display_language is not English — an object with the
+  display_language translations of every user-facing field:
+  {presentation_markdown, short_summary, laws_brief (list parallel to
+  relevant_laws), action_plan, evidence_checklist, drafts}
 
 Important:
 - Return ONLY valid JSON (no surrounding commentary).
@@ -75,14 +132,23 @@ User interface language: {lang}
 Anonymous mode: {anon}
 Location hint: {location}
 display_language: {lang}
+
+If display_language is not English, additionally include the top-level "i18n"
+object with every user-facing field (presentation_markdown, short_summary,
+laws_brief[], action_plan[], evidence_checklist[], drafts) translated natively
+into {lang}. Keep JSON keys, case_type, and law section identifiers in English.
 """
 
+# The system prompt is static; concatenate it once at import instead of
+# rebuilding the large string on every call.
+_PREAMBLE = SYSTEM_PROMPT + "\n\n"
+
 
 def build_prompt(user_text: str, lang: str, anon: bool, location: str) -> str:
     """
     Build the full prompt sent to the LLM.
     """
-    return SYSTEM_PROMPT + "\n\n" + INSTRUCTION_PROMPT.format(
+    return _PREAMBLE + INSTRUCTION_PROMPT.format(
         user_text=user_text, lang=lang, anon=str(anon), location=location or "unknown"
     )
 
@@ -94,18 +160,125 @@ def build_prompt(user_text: str, lang: str, anon: bool, location: str) -> str:
 # Your current API is v1beta, which supports gemini-pro; 1.5 models are giving 404.
 DEFAULT_MODEL = "gemini-2.5-flash"
 
+# Structured-output schema mirroring the SYSTEM_PROMPT fields. With
+# response_mime_type="application/json" the API guarantees parseable JSON,
+# so extract_json_from_text almost never needs its fallback path.
+RESPONSE_SCHEMA = {
+    "type": "OBJECT",
+    "properties": {
+        "case_type": {"type": "STRING"},
+        "severity": {"type": "INTEGER"},
+        "short_summary": {"type": "STRING"},
+        "relevant_laws": {
+            "type": "ARRAY",
+            "items": {
+                "type": "OBJECT",
+                "properties": {
+                    "section": {"type": "STRING"},
+                    "brief": {"type": "STRING"},
+                },
+            },
+        },
+        "documents_needed": {"type": "ARRAY", "items": {"type": "STRING"}},
+        "drafts": {
+            "type": "OBJECT",
+            "properties": {
+                "FIR_email": {"type": "STRING"},
+                "legal_notice": {"type": "STRING"},
+            },
+        },
+        "action_plan": {"type": "ARRAY", "items": {"type": "STRING"}},
+        "evidence_checklist": {"type": "ARRAY", "items": {"type": "STRING"}},
+        "presentation_markdown": {"type": "STRING"},
+        "i18n": {
+            "type": "OBJECT",
+            "properties": {
+                "presentation_markdown": {"type": "STRING"},
+                "short_summary": {"type": "STRING"},
+                "laws_brief": {"type": "ARRAY", "items": {"type": "STRING"}},
+                "action_plan": {"type": "ARRAY", "items": {"type": "STRING"}},
+                "evidence_checklist": {"type": "ARRAY", "items": {"type": "STRING"}},
+                "drafts": {
+                    "type": "OBJECT",
+                    "properties": {
+                        "FIR_email": {"type": "STRING"},
+                        "legal_notice": {"type": "STRING"},
+                    },
+                },
+            },
+        },
+    },
+    "required": ["case_type", "severity", "short_summary"],
+}
+
+GENERATION_CONFIG = {
+    "response_mime_type": "application/json",
+    "response_schema": RESPONSE_SCHEMA,
+    "temperature": 0.2,
+}
+
+# Constructing GenerativeModel redoes SDK client wiring; reuse one per name.
+_MODELS: Dict[str, Any] = {}
+
+
+def _get_model(model_name: str):
+    model = _MODELS.get(model_name)
+    if model is None:
+        model = _MODELS.setdefault(model_name, _genai().GenerativeModel(model_name))
+    return model
+
+
+def stream_gemini(prompt: str, model_name: str = DEFAULT_MODEL, use_cache: bool = True):
+    """
+    Call Gemini with stream=True and yield text chunks as they arrive.
+    Lets app.py show tokens live (st.write_stream) instead of waiting
+    for the full response. On failure yields a single JSON error string
+    (same contract as call_gemini). Cached responses are yielded whole.
+    """
+    if use_cache:
+        cached = _llm_cache_get(model_name, prompt)
+        if cached is not None:
+            yield cached
+            return
 
-def call_gemini(prompt: str, model_name: str = DEFAULT_MODEL) -> str:
+    parts = []
+    try:
+        model = _get_model(model_name)
+        resp = model.generate_content(prompt, generation_config=GENERATION_CONFIG, stream=True)
+        for chunk in resp:
+            # Some chunks (safety/metadata) carry no text
+            text = getattr(chunk, "text", None)
+            if text:
+                parts.append(text)
+                yield text
+    except Exception as e:
+        yield json.dumps({"error": f"{type(e).__name__}: {e}"})
+        return
+
+    if use_cache:
+        _llm_cache_set(model_name, prompt, "".join(parts))
+
+
+def call_gemini(prompt: str, model_name: str = DEFAULT_MODEL, use_cache: bool = True) -> str:
     """
     Call Gemini using the google-generativeai SDK.
     Returns the raw text (string) the model produced (best-effort).
+    Identical (model, prompt) pairs are served from a disk cache;
+    pass use_cache=False to force a fresh call. Errors are never cached.
     """
+    if use_cache:
+        cached = _llm_cache_get(model_name, prompt)
+        if cached is not None:
+            return cached
+
     try:
-        model = genai.GenerativeModel(model_name)
-        resp = model.generate_content(prompt)
+        model = _get_model(model_name)
+        resp = model.generate_content(prompt, generation_config=GENERATION_CONFIG)
 
         # SDK v1: resp.text exists for text models
         if hasattr(resp, "text") and resp.text:
+            if use_cache:
+                _llm_cache_set(model_name, prompt, resp.text)
             return resp.text
 
         # Some SDK responses are dict-like (defensive handling)
@@ -133,7 +306,10 @@ def call_gemini(prompt: str, model_name: str = DEFAULT_MODEL) -> str:
 
 def extract_json_from_text(s: str) -> Optional[Dict[str, Any]]:
     """
-    Try to extract a JSON object from model output text.
+    Parse a JSON object from model output text.
+    With structured output (response_mime_type="application/json") the
+    direct json.loads succeeds; the bracket slice is a last resort for
+    older/cached responses wrapped in commentary.
     Returns parsed dict or None if parsing fails.
     """
     if not s:
@@ -141,24 +317,18 @@ def extract_json_from_text(s: str) -> Optional[Dict[str, Any]]:
 
     s = s.strip()
 
-    # Direct attempt
     try:
         return json.loads(s)
     except Exception:
         pass
 
-    # Try extracting {...}
+    # Last resort: extract the outermost {...}
     start = s.find("{")
     end = s.rfind("}")
-    if start != -1 and end != -1 and end >= start:
-        candidate = s[start:end + 1]
+    if start != -1 and end >= start:
         try:
-            return json.loads(candidate)
+            return json.loads(s[start:end + 1])
         except Exception:
-            try:
-                cleaned = candidate.replace("\n", " ").replace("'", '"')
-                return json.loads(cleaned)
-            except Exception:
-                return None
+            return None
 
     return None
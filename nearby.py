@@ -1,70 +1,231 @@
 # nearby.py
+import asyncio
+import threading
+import time
+from operator import itemgetter
+
+import numpy as np
+import streamlit as st
 from geopy.geocoders import Nominatim
 from geopy.extra.rate_limiter import RateLimiter
-from haversine import haversine, Unit
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple
+
+try:
+    import aiohttp
+except Exception:
+    aiohttp = None
+
+_NOMINATIM_URL = "https://nominatim.openstreetmap.org/search"
+
+# The public Nominatim endpoint allows an absolute maximum of 1 request per
+# second. Every request — query variants, the four category searches in
+# executor threads, and geocode_location — takes a slot from this single
+# process-wide limiter, so a cold Nearby load can't burst 16 concurrent
+# hits and get the app's IP blocked.
+_NOMINATIM_INTERVAL = 1.0
+_throttle_lock = threading.Lock()
+_throttle_last = 0.0
+
+def _nominatim_slot() -> None:
+    """Block until this thread may start a Nominatim request (1 req/s)."""
+    global _throttle_last
+    while True:
+        with _throttle_lock:
+            now = time.monotonic()
+            wait = _throttle_last + _NOMINATIM_INTERVAL - now
+            if wait <= 0:
+                _throttle_last = now
+                return
+        time.sleep(wait)
+
+_EARTH_RADIUS_KM = 6371.0
+
+def _haversine_km(lat: float, lon: float, plats: "np.ndarray", plons: "np.ndarray") -> "np.ndarray":
+    """Vectorized haversine: distances (km) from (lat, lon) to each point."""
+    dlat = np.radians(plats - lat)
+    dlon = np.radians(plons - lon)
+    a = np.sin(dlat / 2) ** 2 + np.cos(np.radians(lat)) * np.cos(np.radians(plats)) * np.sin(dlon / 2) ** 2
+    return _EARTH_RADIUS_KM * 2 * np.arcsin(np.sqrt(a))
 
-geolocator = Nominatim(user_agent="nyaysathi_nearby")
-geocode_multi = RateLimiter(geolocator.geocode, min_delay_seconds=1, max_retries=2, error_wait_seconds=2)
+try:
+    import diskcache
+    _GEO_CACHE = diskcache.Cache(".geo_cache")
+except Exception:
+    _GEO_CACHE = None
+
+# Geocodes are stable; 30 days saves the >=1s throttled Nominatim call.
+_GEO_TTL = 30 * 86400
+
+@st.cache_resource(show_spinner=False)
+def _shared_geocoder():
+    """One rate-limited Nominatim geocoder shared across all sessions."""
+    geolocator = Nominatim(user_agent="nyaysathi_nearby")
+    return RateLimiter(geolocator.geocode, min_delay_seconds=1, max_retries=2, error_wait_seconds=2)
+
+# nearby_search runs from a ThreadPoolExecutor (one worker per category);
+# give each thread its own geolocator for session thread-safety. Request
+# pacing is handled by the global _nominatim_slot limiter above.
+_thread_local = threading.local()
+
+def _get_geolocator() -> Nominatim:
+    geo = getattr(_thread_local, "geolocator", None)
+    if geo is None:
+        geo = Nominatim(user_agent="nyaysathi_nearby")
+        _thread_local.geolocator = geo
+    return geo
+
+async def _query_variant(session, q: str, limit: int):
+    # Wait for the global 1 req/s slot off the event loop
+    await asyncio.to_thread(_nominatim_slot)
+    params = {"q": q, "format": "json", "limit": limit}
+    async with session.get(_NOMINATIM_URL, params=params) as r:
+        if r.status != 200:
+            return []
+        return await r.json()
+
+async def _query_variants(tries: List[str], limit: int):
+    """
+    Try the query variants in order over the REST endpoint; first
+    non-empty answer wins. Under the global 1 req/s throttle a
+    concurrent race is strictly worse — every fired variant burns a
+    slot whether or not it wins — so later variants are only issued
+    when the previous response came back empty.
+    """
+    timeout = aiohttp.ClientTimeout(total=10)
+    headers = {"User-Agent": "nyaysathi_nearby"}
+    async with aiohttp.ClientSession(timeout=timeout, headers=headers) as session:
+        for q in tries:
+            try:
+                places = await _query_variant(session, q, limit)
+            except Exception:
+                continue
+            if places:
+                return places
+    return []
+
+def _cache_get(key):
+    if _GEO_CACHE is None:
+        return None
+    try:
+        return _GEO_CACHE.get(key)
+    except Exception:
+        return None
+
+def _cache_set(key, value):
+    if _GEO_CACHE is None:
+        return
+    try:
+        _GEO_CACHE.set(key, value, expire=_GEO_TTL)
+    except Exception:
+        pass
+
+# In-process memoization via Streamlit (instant repeat queries for the
+# server's lifetime) layered over the disk cache (survives restarts).
+# st.cache_data memoizes return values but NOT exceptions, so the cached
+# helpers raise on failure — a transient Nominatim timeout gets retried on
+# the next rerun instead of pinning None/[] for 30 days. The public
+# wrappers keep the old return-None/empty contract for app.py.
+@st.cache_data(ttl=_GEO_TTL, show_spinner=False)
+def _geocode_cached(text: str) -> Dict:
+    key = ("geocode", text.strip().lower())
+    cached = _cache_get(key)
+    if cached is not None:
+        return cached
+    _nominatim_slot()
+    loc = _shared_geocoder()(text + ", India")
+    if not loc:
+        raise LookupError(f"could not geocode {text!r}")
+    result = {"lat": loc.latitude, "lon": loc.longitude, "address": loc.address}
+    _cache_set(key, result)
+    return result
 
 def geocode_location(text: str) -> Optional[Dict]:
     """Return dict with lat, lon, address for a pincode/city string."""
     try:
-        loc = geocode_multi(text + ", India")
-        if loc:
-            return {"lat": loc.latitude, "lon": loc.longitude, "address": loc.address}
+        return _geocode_cached(text)
     except Exception:
         return None
-    return None
 
-def nearby_search(query: str, lat: float, lon: float, limit: int = 5) -> List[Dict]:
-    """
-    Best-effort search using Nominatim. Returns list of {name, address, lat, lon, distance_km}.
-    This is for demo purposes; for production use Google Places API.
-    """
-    results = []
-    # try search variants
+@st.cache_data(ttl=_GEO_TTL, show_spinner=False)
+def _nearby_search_cached(query: str, lat: float, lon: float, limit: int) -> List[Dict]:
+    # Round coords to 3 decimals (~100 m) so nearby reruns share a cache entry
+    key = ("search", round(lat, 3), round(lon, 3), query, limit)
+    cached = _cache_get(key)
+    if cached is not None:
+        return cached
+
+    # try search variants sequentially with early exit — over the REST
+    # endpoint when aiohttp is available, through blocking geopy otherwise
     tries = [
         f"{query} near {lat},{lon}",
         f"{query} near India",
-        f"{query} {lat} {lon}"
+        f"{query} {lat} {lon}",
+        f"{query} India",
     ]
-    places = None
-    for q in tries:
-        try:
-            places = geolocator.geocode(q, exactly_one=False, limit=limit*2)
-            if places:
-                break
-        except Exception:
-            places = None
+    candidates: List[Tuple[float, float, str]] = []  # (lat, lon, display_name)
 
-    if not places:
-        # fallback: search query + country
+    if aiohttp is not None:
         try:
-            places = geolocator.geocode(f"{query} India", exactly_one=False, limit=limit*2)
+            for p in asyncio.run(_query_variants(tries, limit * 2)):
+                try:
+                    candidates.append((float(p["lat"]), float(p["lon"]), p.get("display_name", "")))
+                except Exception:
+                    continue
         except Exception:
-            places = None
+            candidates = []
 
-    if places:
-        for p in places:
+    if not candidates:
+        places = None
+        geo = _get_geolocator()
+        for q in tries:
             try:
-                plat, plon = float(p.latitude), float(p.longitude)
-                dist = haversine((lat, lon), (plat, plon), unit=Unit.KILOMETERS)
-                results.append({
-                    "name": getattr(p, "raw", {}).get("display_name", str(query)),
-                    "address": getattr(p, "raw", {}).get("display_name", "") or p.address or "",
-                    "lat": plat,
-                    "lon": plon,
-                    "distance_km": round(dist, 2)
-                })
+                _nominatim_slot()
+                places = geo.geocode(q, exactly_one=False, limit=limit*2)
+                if places:
+                    break
+            except Exception:
+                places = None
+        for p in places or []:
+            try:
+                name = getattr(p, "raw", {}).get("display_name", "") or p.address or ""
+                candidates.append((float(p.latitude), float(p.longitude), name))
             except Exception:
                 continue
 
-    # dedupe and sort
+    # dedupe on insert: places sharing the same ~1m-rounded coordinates are
+    # the same hit, so skip the dict build for repeats
     uniq = {}
-    for r in results:
-        key = (round(r["lat"], 5), round(r["lon"], 5))
-        if key not in uniq or uniq[key]["distance_km"] > r["distance_km"]:
-            uniq[key] = r
-    out = sorted(list(uniq.values()), key=lambda x: x["distance_km"])[:limit]
+    for plat, plon, name in candidates:
+        pkey = (round(plat, 5), round(plon, 5))
+        if pkey in uniq:
+            continue
+        uniq[pkey] = {
+            "name": name or str(query),
+            "address": name,
+            "lat": plat,
+            "lon": plon,
+        }
+
+    # one vectorized distance pass over all candidates
+    hits = list(uniq.values())
+    if hits:
+        plats = np.fromiter((h["lat"] for h in hits), float, count=len(hits))
+        plons = np.fromiter((h["lon"] for h in hits), float, count=len(hits))
+        for h, km in zip(hits, _haversine_km(lat, lon, plats, plons)):
+            h["distance_km"] = round(float(km), 2)
+
+    out = sorted(hits, key=itemgetter("distance_km"))[:limit]
+    if not out:
+        raise LookupError(f"no nearby results for {query!r}")
+    _cache_set(key, out)
     return out
+
+def nearby_search(query: str, lat: float, lon: float, limit: int = 5) -> List[Dict]:
+    """
+    Best-effort search using Nominatim. Returns list of {name, address, lat, lon, distance_km}.
+    This is for demo purposes; for production use Google Places API.
+    """
+    try:
+        return _nearby_search_cached(query, lat, lon, limit)
+    except Exception:
+        return []
@@ -1,21 +1,178 @@
 # utils.py
+import contextlib
+import functools
+import hashlib
+import time
+import types
+
 from deep_translator import GoogleTranslator
 from typing import List
 
-LANG_MAP = {
+try:
+    import diskcache
+    _TRANS_CACHE = diskcache.Cache(".trans_cache")
+except Exception:
+    _TRANS_CACHE = None
+
+# Optional: compiled fastText language guess (~microseconds) lets us skip
+# the ~200ms round trip when the text is already in the target language.
+try:
+    from fast_langdetect import detect as _detect_lang
+except Exception:
+    _detect_lang = None
+
+# Cache translations for 30 days; they never change for the same input.
+_TRANS_TTL = 30 * 86400
+
+# Read-only mapping: nothing should mutate the language table at runtime
+LANG_MAP = types.MappingProxyType({
     "English": "en", "Hindi": "hi", "Kannada": "kn", "Marathi": "mr",
     "Tamil": "ta", "Telugu": "te", "Bengali": "bn", "Gujarati": "gu"
-}
+})
+
+# Reuse one GoogleTranslator per target language instead of rebuilding per call
+_TRANSLATORS = {}
+
+def _get_translator(target_code: str) -> GoogleTranslator:
+    tr = _TRANSLATORS.get(target_code)
+    if tr is None:
+        tr = _TRANSLATORS.setdefault(target_code, GoogleTranslator(source='auto', target=target_code))
+    return tr
+
+def _cache_key(text: str, target_code: str):
+    return (target_code, hashlib.blake2b(text.encode(), digest_size=16).hexdigest())
+
+@functools.lru_cache(maxsize=4096)
+def _translate_cached(text: str, target_code: str) -> str:
+    """
+    Translate one string to target_code. Memoized in-process (repeated
+    strings within a render translate once), backed by the disk cache,
+    and only then by the network. Raises on a failed translation so the
+    untranslated fallback is never memoized — lru_cache has no TTL, and
+    deep-translator throttling is routine; the caller retries next time.
+    """
+    # Fast path: already in the target language. Only trust the guess on
+    # longer texts — short strings misdetect.
+    if _detect_lang is not None and len(text) > 20:
+        try:
+            if _detect_lang(text.replace("\n", " "))["lang"] == target_code:
+                return text
+        except Exception:
+            pass
+
+    # Disk-cache hit skips the network round trip entirely
+    key = _cache_key(text, target_code)
+    if _TRANS_CACHE is not None:
+        try:
+            cached = _TRANS_CACHE.get(key)
+            if cached is not None:
+                return cached
+        except Exception:
+            pass
+
+    result = _get_translator(target_code).translate(text)
+    if not result:
+        raise ValueError("empty translation result")
+
+    if _TRANS_CACHE is not None:
+        try:
+            _TRANS_CACHE.set(key, result, expire=_TRANS_TTL)
+        except Exception:
+            pass
+    return result
+
+@contextlib.contextmanager
+def timed(name: str):
+    """
+    Record wall time of a block into st.session_state["_timings"] as
+    {name, elapsed_s, ts}. The Settings page aggregates these so the
+    slow stages (model, translation, geocoding) show up in real traffic.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        try:
+            import streamlit as st
+            st.session_state.setdefault("_timings", []).append(
+                {"name": name, "elapsed_s": elapsed, "ts": time.time()}
+            )
+        except Exception:
+            # No Streamlit context (e.g. module used standalone): skip
+            pass
+
+def looks_non_english(text: str) -> bool:
+    """
+    Heuristic language check: every non-English UI language here uses a
+    non-Latin script, so a string whose letters are mostly non-ASCII was
+    already written natively by the model and needs no translation.
+    """
+    if not text:
+        return False
+    letters = [c for c in text if c.isalpha()]
+    if not letters:
+        return False
+    non_ascii = sum(1 for c in letters if ord(c) > 127)
+    return non_ascii / len(letters) > 0.5
 
 def translate_text(text: str, target_language_name: str) -> str:
     """Translate using Deep Translator. target_language_name like 'Hindi' or 'English'."""
     if not text:
         return text
-    target_code = LANG_MAP.get(target_language_name, "en")
     try:
-        return GoogleTranslator(source='auto', target=target_code).translate(text)
+        return _translate_cached(text, LANG_MAP.get(target_language_name, "en"))
     except Exception:
         return text
 
+def translate_many(items: List[str], target_language_name: str) -> List[str]:
+    """
+    Translate a list of strings in ONE GoogleTranslator round trip.
+    Cache hits are served from disk; only the misses go over the wire
+    (translate_batch), then get written back to the cache. Order and
+    length of the returned list match the input.
+    """
+    items = items or []
+    if not items:
+        return []
+    target_code = LANG_MAP.get(target_language_name, "en")
+
+    results: List[str] = list(items)
+    missing_idx = []
+    for i, text in enumerate(items):
+        if not text:
+            continue
+        if _TRANS_CACHE is not None:
+            try:
+                cached = _TRANS_CACHE.get(_cache_key(text, target_code))
+                if cached is not None:
+                    results[i] = cached
+                    continue
+            except Exception:
+                pass
+        missing_idx.append(i)
+
+    if missing_idx:
+        # Identical strings recur within one analysis; translate each once
+        unique: dict = {}
+        for i in missing_idx:
+            unique.setdefault(items[i], []).append(i)
+        try:
+            translated = _get_translator(target_code).translate_batch(list(unique))
+        except Exception:
+            # Batch call failed: keep the originals rather than erroring out
+            return results
+        for text, out in zip(unique, translated):
+            if not out:
+                continue
+            for i in unique[text]:
+                results[i] = out
+            if _TRANS_CACHE is not None:
+                try:
+                    _TRANS_CACHE.set(_cache_key(text, target_code), out, expire=_TRANS_TTL)
+                except Exception:
+                    pass
+    return results
+
 def translate_list(items: List[str], target_language_name: str) -> List[str]:
-    return [translate_text(i, target_language_name) for i in (items or [])]
+    return translate_many([str(i) for i in (items or [])], target_language_name)